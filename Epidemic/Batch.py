@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: iso8859-1 -*-
+
+"""Batch module, useful to run many epidemic simulations, described by scenario files, in a single process."""
+
+import os
+import sys
+
+import Epidemic
+
+USAGE = """%prog [options] SCENARIO_FILE...
+
+Runs the epidemic scenarios described by the given files and writes the result
+of every scenario to a json file, that can also be plotted with the Plot module.
+A scenario file is either:
+- a json file, containing the parameters of an epidemic or a list of them;
+- an ini file, with a section of parameters for every epidemic.
+Scenarios with the same name get a numeric suffix, like name_2."""
+
+def parse_value(value):
+    """Returns the python value of a parameter written in an ini file (a number, a boolean or a string)."""
+    for convert in [int, float]:
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    if value.lower() in ['true', 'yes', 'on']:
+        return True
+    if value.lower() in ['false', 'no', 'off']:
+        return False
+    return value
+
+def load_scenarios(filename):
+    """Loads the scenarios described by a json or ini file.
+
+    Input: the name of the scenario file
+    Output: a list of (name, epidemic_params) pairs, named after the file and, if more than one, the section or the position
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    if filename.endswith('.ini'):
+        import ConfigParser
+        parser = ConfigParser.RawConfigParser()
+        # parameters' names are case sensitive
+        parser.optionxform = str
+        if not parser.read(filename):
+            raise IOError("no such file")
+        return [('%s_%s'% (name, section), dict([(param, parse_value(value)) for param, value in parser.items(section)]))
+                for section in parser.sections()]
+    import json
+    scenario_file = open(filename)
+    try:
+        scenarios = json.load(scenario_file)
+    finally:
+        scenario_file.close()
+    if isinstance(scenarios, dict):
+        return [(name, scenarios)]
+    return [('%s_%i'% (name, i), params) for i, params in enumerate(scenarios)]
+
+def unique_name(name, names):
+    """Returns the given name or, if already used, the name with the first free numeric suffix; the name is then marked as used.
+
+    Scenario files with the same name in different directories would otherwise overwrite each other's results.
+    """
+    unique = name
+    suffix = 1
+    while unique in names:
+        suffix += 1
+        unique = '%s_%i'% (name, suffix)
+    names.add(unique)
+    return unique
+
+def run_scenario(job):
+    """Runs a scenario and saves its result; used by the process pool.
+
+    Input: the name of the scenario, its parameters, the output directory and whether the series are recorded
+    Output: the name of the scenario, the name of the result file and the error, if any
+    """
+    name, epidemic_params, output_dir, record = job
+    params = dict([(str(param), value) for param, value in epidemic_params.items()])
+    params.update(progress=False, stats=False, plot=False, quiet=True, record=record)
+    filename = os.path.join(output_dir, name + '.json')
+    try:
+        Epidemic.Epidemic(params).save_result(filename)
+    except Exception, error:
+        return name, None, str(error)
+    return name, filename, None
+
+def main(argv=None):
+    """Runs the scenario files given on the command line; it's the entry point of the epidemic command."""
+    from optparse import OptionParser
+    parser = OptionParser(usage=USAGE)
+    parser.add_option('-o', '--output-dir', default='.',
+                      help="directory of the result files [default: %default]")
+    parser.add_option('-j', '--processes', type='int', default=1,
+                      help="number of worker processes, 0 for the number of cpus [default: %default]")
+    parser.add_option('--no-series', dest='record', action='store_false', default=True,
+                      help="save only the summary statistics, without the evolution of the population")
+    options, filenames = parser.parse_args(argv)
+    if not filenames:
+        parser.error("no scenario file given.")
+    jobs = []
+    names = set()
+    for filename in filenames:
+        try:
+            scenarios = load_scenarios(filename)
+        except Exception, error:
+            parser.error("the scenario file %s cannot be loaded: %s"% (filename, error))
+        for name, params in scenarios:
+            jobs.append((unique_name(name, names), params, options.output_dir, options.record))
+    if not os.path.isdir(options.output_dir):
+        os.makedirs(options.output_dir)
+    if options.processes == 1:
+        outcomes = map(run_scenario, jobs)
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(options.processes or None)
+        try:
+            outcomes = pool.map(run_scenario, jobs)
+        finally:
+            pool.close()
+            pool.join()
+    failures = 0
+    for name, filename, error in outcomes:
+        if error is None:
+            print "%s: %s"% (name, filename)
+        else:
+            failures += 1
+            print >> sys.stderr, "%s: failed, %s"% (name, error)
+    if failures:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,20 +10,100 @@ import random
 import sys
 import time
 
-# Use Psyco if available
-try:
-    import psyco
-    psyco.full()
-    # psyco.log('Epidemic-psyco.log')
-except ImportError:
-    print "warning: the psyco module cannot be found. The simulation will run anyway, maybe slower."
-    pass
-
 try:
     from SimPy.Simulation import Monitor, Process, stopSimulation, activate, \
                                  passivate, simulate, initialize, hold, now
 except ImportError:
-    print "error: the SimPy.Simulation package cannot be found. Install SimPy and try again."
+    raise ImportError("the SimPy.Simulation package cannot be found. Install SimPy and try again.")
+
+# Psyco is looked for at the first simulation, not at import time
+psyco_available = None
+
+def enable_psyco():
+    """Uses Psyco, if available, to speed up the simulations; returns true if it's available."""
+    global psyco_available
+    if psyco_available is None:
+        try:
+            import psyco
+            psyco.full()
+            # psyco.log('Epidemic-psyco.log')
+            psyco_available = True
+        except ImportError:
+            psyco_available = False
+    return psyco_available
+
+class Statistics:
+    """Summary statistics of an epidemic, updated at every change of the population without storing its evolution."""
+
+    def __init__(self, initial_infects):
+        """The constructor of the class.
+           Full statistics' list:
+            - peak_infects: maximum number of infects
+            - peak_time: time of the first reaching of the maximum number of infects
+            - final_size: number of individuals infected at least once, including the initial infects
+            - deaths: number of deaths caused by epidemic
+            - natural_deaths: number of deaths not caused by epidemic
+            - infection_area: area under the curve of the number of infects against time
+            - extinction_time: time at which the infects ran out, or None
+            - nr_events: number of changes of the population
+            - end_time: time at the end of the simulation
+        """
+        self.peak_infects = initial_infects
+        self.peak_time = 0
+        self.final_size = initial_infects
+        self.deaths = 0
+        self.natural_deaths = 0
+        self.infection_area = 0
+        self.extinction_time = None
+        self.nr_events = 0
+        self.end_time = 0
+        self.last_infects = initial_infects
+        if initial_infects == 0:
+            self.extinction_time = 0
+
+    def update(self, time, infects, new_infect=False, death=False, natural_death=False):
+        """Updates the statistics after a change of the population.
+
+        Input: the current time and number of infects, and the kind of the change
+               (new_infect is true only for the first infection of an individual)
+        Output: none
+        """
+        self.nr_events += 1
+        self.infection_area += self.last_infects * (time - self.end_time)
+        self.end_time = time
+        self.last_infects = infects
+        if new_infect:
+            self.final_size += 1
+        if death:
+            self.deaths += 1
+        if natural_death:
+            self.natural_deaths += 1
+        if infects > self.peak_infects:
+            self.peak_infects = infects
+            self.peak_time = time
+        if infects == 0:
+            if self.extinction_time is None:
+                self.extinction_time = time
+        else:
+            self.extinction_time = None
+
+    def close(self, time):
+        """Completes the statistics at the end of the simulation."""
+        self.infection_area += self.last_infects * (time - self.end_time)
+        self.end_time = time
+
+    def as_dict(self):
+        """Returns the statistics as a dictionary."""
+        return dict(
+            peak_infects = self.peak_infects,
+            peak_time = self.peak_time,
+            final_size = self.final_size,
+            deaths = self.deaths,
+            natural_deaths = self.natural_deaths,
+            infection_area = self.infection_area,
+            extinction_time = self.extinction_time,
+            nr_events = self.nr_events,
+            end_time = self.end_time)
 
 class Epidemic:
     """A class for modelling and simulating epidemics."""
@@ -50,14 +130,27 @@ class Epidemic:
             - progress: show a progress indicator during the simulation
             - stats: show some stats at the end of the simulation
             - plot: show a plot representing the evolution of the population at the end of the simulation
+            - record: record the evolution of the population in monitors; if false, only the summary
+              statistics are kept and the plot is not available
+            - quiet: don't print the reason of a premature end of the simulation
+            - restart: the simulation continues from the state of a previous one, so the initial
+              individuals, already in the middle of their life cycle, skip the natural death draw
+            - seed: seed of the random number generator, for reproducible simulations
+            - stop_condition: a function called with the epidemic after every change of the population;
+              if it returns true, the simulation is stopped
         """
         # setting up the epidemic's parameters with metaprogramming
+        self.epidemic_params = epidemic_params
         for param in epidemic_params:
             self.__dict__[param] = epidemic_params.get(param)
         # setting the uninitialized parameters to their default values
-        self.check_and_set_default_value(['initial_immunes', 'recover_rate', 'death_rate', 'immunization_vanish_rate', 'newborn_prob', 'natural_death_prob'], ['immune_after_recovery', 'newborn_can_be_immune', 'newborn_can_be_infect', 'debug', 'process_debug', 'progress', 'stats', 'plot'])
+        self.check_and_set_default_value(['initial_immunes', 'recover_rate', 'death_rate', 'immunization_vanish_rate', 'newborn_prob', 'natural_death_prob'], ['immune_after_recovery', 'newborn_can_be_immune', 'newborn_can_be_infect', 'debug', 'process_debug', 'progress', 'stats', 'plot', 'record', 'quiet', 'restart'])
+        if not hasattr(self, 'stop_condition'):
+            self.stop_condition = None
+        if not enable_psyco() and self.debug:
+            print "warning: the psyco module cannot be found. The simulation will run anyway, maybe slower."
         # setting the random number generator using the python standard one
-        self.rng = random.Random()
+        self.rng = random.Random(epidemic_params.get('seed'))
         # checking some features of the model from parameters passed to the constructor
         self.model_has_immunization = self.model_has_immunization()
         self.model_immunization_is_permanent = self.model_immunization_is_permanent()
@@ -74,14 +167,17 @@ class Epidemic:
         self.total_newborns = 0
         self.total_natural_deaths = 0
         self.total_deaths = 0
+        # setting up the summary statistics, updated at every change of the population
+        self.statistics = Statistics(self.initial_infects)
         # setting up the monitors for watching interesting variables
-        self.m_suscettibili = Monitor(name="Suscettibili", ylab="suscettibili")
-        self.m_suscettibili.append([0, self.total_susceptibles])
-        self.m_infetti = Monitor(name="Infetti", ylab='infetti')
-        self.m_infetti.append([0, self.initial_infects])
-        if self.model_has_immunization:
-            self.m_immuni = Monitor(name="Immuni", ylab='immuni')
-            self.m_immuni.append([0, self.initial_immunes])
+        if self.record:
+            self.m_suscettibili = Monitor(name="Suscettibili", ylab="suscettibili")
+            self.m_suscettibili.append([0, self.total_susceptibles])
+            self.m_infetti = Monitor(name="Infetti", ylab='infetti')
+            self.m_infetti.append([0, self.initial_infects])
+            if self.model_has_immunization:
+                self.m_immuni = Monitor(name="Immuni", ylab='immuni')
+                self.m_immuni.append([0, self.initial_immunes])
         # setting up the array of all the individuals partecipating to the simulation
         self.all_individuals = []
         # initialize the simulation environment (time, events, ...)
@@ -96,20 +192,21 @@ class Epidemic:
             else:
                 ind = self.Individual(self, ind_id=i)
             # activate it with function live()
-            activate(ind, ind.live(), at=0.0)
+            activate(ind, ind.live(natural_death_draw=not self.restart), at=0.0)
         self.start_time = time.time()
         if self.process_debug:
             self.show_processes_status()
         # start the simulation
         simulate(until=self.run_time)
         self.stop_time = time.time()
+        self.statistics.close(now())
         if self.process_debug:
             self.show_processes_status()
         # show final stats if required by params
         if self.stats:
             self.show_stats()
         # show plot if required by params
-        if self.plot:
+        if self.plot and self.record:
             self.show_plot()
 
     def model_has_recovering(self):
@@ -174,7 +271,7 @@ class Epidemic:
         """Checks if some optional parameters are set and, if not, set them to their default values.
         The default values of the optional parameters are:
         - 0 for every numerical parameters;
-        - True for parameters "progress", "plot", "stats"
+        - True for parameters "progress", "plot", "stats", "record"
         - False for every other boolean parameters
 
         Input: two dictionaries of optional parameters of the constructor of the class
@@ -185,7 +282,7 @@ class Epidemic:
                 self.__dict__[param] = 0
         for param in bool_params:
             if hasattr(self, param) == False:
-                if param in ['progress', 'plot', 'stats']:
+                if param in ['progress', 'plot', 'stats', 'record']:
                     self.__dict__[param] = True
                 else:
                     self.__dict__[param] = False
@@ -232,6 +329,8 @@ class Epidemic:
 
     def observe_vars(self):
         """Watches and records the values of the monitored variables."""
+        if not self.record:
+            return
         self.m_infetti.observe(self.total_infects)
         self.m_suscettibili.observe(self.total_susceptibles)
         if self.model_has_immunization:
@@ -239,25 +338,38 @@ class Epidemic:
 
     def check_termination_conds(self):
         """Checks particular situations in which the simulation can be stopped before the time runs out."""
+        if self.check_stop_condition():
+            return True
         if self.total_infects == 0:
             if self.debug:
                 print "[%f] STOP: infection ended, no more infects!"% (now())
-            print "\nSimulation ended prematurely: infection ended, no more infects."
+            if not self.quiet:
+                print "\nSimulation ended prematurely: infection ended, no more infects."
             return True
         if not self.model_has_new_susceptibles:
             if self.total_susceptibles == 0 and self.total_immunes == 0:
                 if self.debug:
                     print "[%f] STOP: infection extended to the whole population!"% (now())
-                print "\nSimulation ended prematurely: infection extended to the whole population."
+                if not self.quiet:
+                    print "\nSimulation ended prematurely: infection extended to the whole population."
                 return True
         if self.model_immunization_is_permanent and not self.model_has_vital_dynamics:
             if self.total_susceptibles == 0 and self.total_immunes == 0:
                 if self.debug:
                     print "[%f] STOP: infection ended, permanent immunizzation extended to the whole population!"% (now())
-                print "\nSimulation ended prematurely: infection ended, permanent immunizzation extended to the whole population."
+                if not self.quiet:
+                    print "\nSimulation ended prematurely: infection ended, permanent immunizzation extended to the whole population."
                 return True
         return False
 
+    def check_stop_condition(self):
+        """Checks the user-defined stop condition, if any, passed with the parameter "stop_condition"."""
+        if self.stop_condition is not None and self.stop_condition(self):
+            if self.debug:
+                print "[%f] STOP: user-defined stop condition reached!"% (now())
+            return True
+        return False
+
     def check_current_nr_individuals(self):
         """Checks the correct number of individuals during the simulation."""
         assert self.nr_individuals + self.total_newborns - self.total_natural_deaths - self.total_deaths == self.total_susceptibles + self.total_infects + self.total_immunes, "error: assert failed on the current number of individuals."
@@ -267,39 +379,69 @@ class Epidemic:
         stopSimulation()
 
     def show_plot(self):
-        """Plots the number of infected, susceptibles and, eventually, immunes against time using gnuplot-py."""
+        """Plots the number of infected, susceptibles and, eventually, immunes against time.
+
+        With a display, the plot is shown with gnuplot-py; without it, the plot is rendered
+        in batch to a png file with a unique name in the current directory.
+        """
+        import Plot
+        if os.getenv('DISPLAY') == None:
+            try:
+                print "\nPlot saved to %s"% (Plot.render_run(self.result()))
+            except RuntimeError, error:
+                print "warning: %s The simulation has run anyway, but you could not plot the graph."% (error)
+            return
         try:
             import Gnuplot
         except ImportError:
             print "warning: the gnuplot-py module cannot be found. The simulation will run anyway, but you could not plot the graph."
-            pass
-        g = Gnuplot.Gnuplot()
-        if os.getenv('DISPLAY') == None:
-	    g('set term png')
-            g('set output "test.png"')
-	else:
-	    g('persist=1')
+            return
+        g = Gnuplot.Gnuplot(persist=1)
         g.xlabel('t')
         g.ylabel('number of individuals')
-        x_infetti = self.m_infetti.tseries()
-        y_infetti = self.m_infetti.yseries()
-        x_suscettibili = self.m_suscettibili.tseries()
-        y_suscettibili = self.m_suscettibili.yseries()
-        g_infetti = Gnuplot.Data(x_infetti, y_infetti, inline=True, title='Infects', with='steps 1')
-        g_suscettibili = Gnuplot.Data(x_suscettibili, y_suscettibili, inline=True, title='Susceptibles', with='steps 2')
-        if self.model_has_immunization:
-            x_immuni = self.m_immuni.tseries()
-            y_immuni = self.m_immuni.yseries()
-            g_immuni = Gnuplot.Data(x_immuni, y_immuni, inline=True, title='Immunes', with='steps 3')
-            g.plot(g_infetti, g_suscettibili, g_immuni)
-            g.title('Graph of susceptibles, infects and immunes against time')
-        else:
-            g.plot(g_infetti, g_suscettibili)
-            g.title('Graph of susceptibles, infects against time')
+        series = self.result()['series']
+        data = []
+        for name, title, style in Plot.SERIES:
+            if name in series:
+                x, y = zip(*Plot.downsample(series[name], Plot.WIDTH))
+                data.append(Gnuplot.Data(x, y, inline=True, title=title, with_='steps %i'% (style)))
+        g.title(Plot.title(series))
+        g.plot(*data)
         # other possible graph types:
-        # with='steps'
-        # with='lines'
-        # with='lp 1 2', where 1 is the color and 2 is the marks' type
+        # with_='steps'
+        # with_='lines'
+        # with_='lp 1 2', where 1 is the color and 2 is the marks' type
+
+    def result(self):
+        """Returns the parameters, the final population, the summary statistics and, if recorded, the evolution of the population."""
+        params = {}
+        for param in self.epidemic_params:
+            if not callable(self.epidemic_params.get(param)):
+                params[param] = self.epidemic_params.get(param)
+        series = {}
+        if self.record:
+            series['infects'] = [list(point) for point in self.m_infetti]
+            series['susceptibles'] = [list(point) for point in self.m_suscettibili]
+            if self.model_has_immunization:
+                series['immunes'] = [list(point) for point in self.m_immuni]
+        population = dict(
+            susceptibles = self.total_susceptibles,
+            infects = self.total_infects,
+            immunes = self.total_immunes,
+            deaths = self.total_deaths,
+            newborns = self.total_newborns,
+            natural_deaths = self.total_natural_deaths)
+        return dict(params=params, population=population, statistics=self.statistics.as_dict(), series=series,
+                    duration=self.stop_time - self.start_time)
+
+    def save_result(self, filename):
+        """Saves the result of the simulation to a json file, that can be plotted later."""
+        import json
+        result_file = open(filename, 'w')
+        try:
+            json.dump(self.result(), result_file)
+        finally:
+            result_file.close()
 
     def show_stats(self):
         """Prints some data about the epidemic's simulation."""
@@ -315,6 +457,13 @@ class Epidemic:
         if self.model_has_vital_dynamics:
             print "- births: %i"% (self.total_newborns)
             print "- deaths for natural reasons: %i"% (self.total_natural_deaths)
+        print "Summary of the epidemic:"
+        print "- peak of infects: %i at time %f"% (self.statistics.peak_infects, self.statistics.peak_time)
+        print "- final size (individuals infected): %i"% (self.statistics.final_size)
+        print "- area under the infection curve: %f"% (self.statistics.infection_area)
+        if self.statistics.extinction_time is not None:
+            print "- time to extinction: %f"% (self.statistics.extinction_time)
+        print "- number of events: %i"% (self.statistics.nr_events)
 
     def show_progress(self):
         """Shows a progress indicator during the run of the simulation."""
@@ -329,8 +478,11 @@ class Epidemic:
         self.total_newborns += 1
         ind = self.Individual(self, ind_id= self.nr_individuals + self.total_newborns, health_status = health_status)
         self.__dict__['total_' + health_status + 's'] += 1
+        self.statistics.update(now(), self.total_infects, new_infect=(health_status == 'infect'))
         self.observe_vars()
         activate(ind, ind.live(), at=0.0)
+        if self.check_stop_condition():
+            self.stop_simulation()
 
     def print_debug(self, func):
         """Prints a debug line about the population's status."""
@@ -339,12 +491,14 @@ class Epidemic:
 
     class Individual(Process):
         """An individual in a population, either susceptible, infect or immune."""
-        __slots__ = 'ind_id', 'epidemic', 'health_status'
+        __slots__ = 'ind_id', 'epidemic', 'health_status', 'ever_infected'
         def __init__(self, epidemic, ind_id, health_status='susceptible'):
             Process.__init__(self)
             self.ind_id = ind_id
             self.e = epidemic
             self.health_status = health_status
+            # reinfections don't count in the final size of the epidemic
+            self.ever_infected = (health_status == 'infect')
             self.e.all_individuals.append(self)
 
         def choose_contact(self):
@@ -359,6 +513,8 @@ class Epidemic:
             self.health_status = 'infect'
             self.e.total_infects += 1
             self.e.total_susceptibles -= 1
+            self.e.statistics.update(now(), self.e.total_infects, new_infect=not self.ever_infected)
+            self.ever_infected = True
             self.e.check_current_nr_individuals()
             self.e.observe_vars()
             self.e.print_debug('get_infect')
@@ -371,6 +527,7 @@ class Epidemic:
             self.health_status = 'immune'
             self.e.total_immunes += 1
             self.e.total_infects -= 1
+            self.e.statistics.update(now(), self.e.total_infects)
             self.e.check_current_nr_individuals()
             self.e.observe_vars()
             self.e.print_debug('get_immune')
@@ -386,6 +543,7 @@ class Epidemic:
                 self.e.total_infects -= 1
             elif self.e.immunization_vanish_rate != 0:
                 self.e.total_immunes -= 1
+            self.e.statistics.update(now(), self.e.total_infects)
             self.e.check_current_nr_individuals()
             self.e.observe_vars()
             self.e.print_debug('get_susceptible')
@@ -430,20 +588,26 @@ class Epidemic:
             else:
                 self.e.total_deaths += 1
             self.e.__dict__['total_' + self.health_status + 's'] -= 1
+            self.e.statistics.update(now(), self.e.total_infects, death=not naturally, natural_death=naturally)
             self.e.observe_vars()
             self.e.all_individuals.remove(self)
             self.e.print_debug('die')
+            if self.e.check_stop_condition():
+                self.e.stop_simulation()
 
-        def live(self):
+        def live(self, natural_death_draw=True):
             """Method that defines the life cycle of the individual.
-            This is the Process Execution Method (PEM) of the SimPy process."""
+            This is the Process Execution Method (PEM) of the SimPy process.
+            The natural death is drawn at the start of every cycle, but the first one
+            if natural_death_draw is false."""
 
             while 1:
                 # considering the natural death probability
-                if self.e.natural_death_prob:
+                if self.e.natural_death_prob and natural_death_draw:
                     if self.e.rng.random() <= self.e.natural_death_prob:
                         self.die(naturally=True)
                         yield passivate, self
+                natural_death_draw = True
 
                 # life cycle of a susceptible individual
                 while self.health_status == 'susceptible':
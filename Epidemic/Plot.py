@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: iso8859-1 -*-
+
+"""Plot module, useful to render the results of many epidemic simulations to image files."""
+
+from __future__ import division
+
+import os
+import subprocess
+import tempfile
+
+# the series of a result, with their titles and gnuplot line styles
+SERIES = [('infects', 'Infects', 1), ('susceptibles', 'Susceptibles', 2), ('immunes', 'Immunes', 3)]
+# default size in pixels of the rendered images
+WIDTH = 800
+HEIGHT = 600
+
+def load_result(filename):
+    """Loads the result of a simulation saved with Epidemic.save_result()."""
+    import json
+    result_file = open(filename)
+    try:
+        return json.load(result_file)
+    finally:
+        result_file.close()
+
+def title(series):
+    """Returns the title of the plot of the given series."""
+    if 'immunes' in series:
+        return 'Graph of susceptibles, infects and immunes against time'
+    else:
+        return 'Graph of susceptibles, infects against time'
+
+def downsample(points, width):
+    """Reduces a step series to at most four points for every pixel of the plot.
+
+    For every pixel, the first, the lowest, the highest and the last points are kept,
+    so that the drawn steps are the same of the full series.
+
+    Input: a list of (time, value) points, ordered by time, and the width of the plot in pixels
+    Output: the reduced list of points
+    """
+    if len(points) <= 4 * width:
+        return points
+    start = points[0][0]
+    pixel = (points[-1][0] - start) / width
+    if pixel == 0:
+        return [points[0], points[-1]]
+    reduced = []
+    column = []
+    column_nr = 0
+    for point in points:
+        nr = min(int((point[0] - start) / pixel), width - 1)
+        if nr != column_nr and column:
+            reduced.extend(reduce_column(column))
+            column = []
+        column_nr = nr
+        column.append(point)
+    reduced.extend(reduce_column(column))
+    return reduced
+
+def reduce_column(column):
+    """Returns the first, lowest, highest and last points of a pixel column, ordered by time."""
+    indexes = set([0, len(column) - 1])
+    values = [point[1] for point in column]
+    indexes.add(values.index(min(values)))
+    indexes.add(values.index(max(values)))
+    return [column[i] for i in sorted(indexes)]
+
+def value_at(points, time, start=0):
+    """Returns the value of a step series at the given time, and the index of the step.
+
+    The search starts from the given index, to resample a series in linear time.
+    """
+    i = start
+    while i + 1 < len(points) and points[i + 1][0] <= time:
+        i += 1
+    return points[i][1], i
+
+def quantile(values, q):
+    """Returns the q-quantile of the given values, interpolating between the nearest ones."""
+    values = sorted(values)
+    position = q * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def quantile_bands(results, name, quantiles, width):
+    """Returns the quantiles of a series among many results, at every pixel of the plot.
+
+    Input: the results, the name of the series, the quantiles and the width of the plot in pixels
+    Output: a list of rows, each made of the time and the value of every quantile
+    """
+    all_points = [result['series'][name] for result in results if result['series'].get(name)]
+    end = max([points[-1][0] for points in all_points])
+    indexes = [0] * len(all_points)
+    rows = []
+    for column in range(width + 1):
+        time = end * column / width
+        values = []
+        for j, points in enumerate(all_points):
+            value, indexes[j] = value_at(points, time, indexes[j])
+            values.append(value)
+        rows.append([time] + [quantile(values, q) for q in quantiles])
+    return rows
+
+def output_file(output_dir, prefix, image_format):
+    """Creates an empty image file with a unique name and returns its name."""
+    fd, filename = tempfile.mkstemp(prefix=prefix + '-', suffix='.' + image_format, dir=output_dir)
+    os.close(fd)
+    return filename
+
+def header(filename, image_format, width, height, plot_title):
+    """Returns the gnuplot commands setting the output image and the labels of the plot."""
+    return ['set terminal %s size %i,%i'% (image_format, width, height),
+            'set output "%s"'% (filename),
+            'set title "%s"'% (plot_title),
+            'set xlabel "t"',
+            'set ylabel "number of individuals"']
+
+def inline_data(rows):
+    """Returns the gnuplot inline data block of the given rows."""
+    return [' '.join([repr(value) for value in row]) for row in rows] + ['e']
+
+def run_gnuplot(commands, filename):
+    """Runs gnuplot in batch mode with the given commands, without any display.
+
+    If gnuplot cannot be run or fails, the image file is removed.
+    """
+    try:
+        try:
+            gnuplot = subprocess.Popen(['gnuplot'], stdin=subprocess.PIPE)
+        except OSError:
+            raise RuntimeError("the gnuplot program cannot be found. Install gnuplot and try again.")
+        gnuplot.communicate('\n'.join(commands) + '\n')
+        if gnuplot.returncode != 0:
+            raise RuntimeError("gnuplot failed with exit status %i."% (gnuplot.returncode))
+    except:
+        os.remove(filename)
+        raise
+
+def render_run(result, output_dir='.', image_format='png', width=WIDTH, height=HEIGHT, prefix='epidemic'):
+    """Renders the evolution of the population of a simulation to an image file.
+
+    Input: a result of Epidemic.result() or the name of a file saved with Epidemic.save_result()
+    Output: the name of the rendered image file
+    """
+    if isinstance(result, basestring):
+        prefix = os.path.splitext(os.path.basename(result))[0]
+        result = load_result(result)
+    series = result['series']
+    if not [name for name, series_title, style in SERIES if series.get(name)]:
+        raise ValueError("the result has no recorded series: run the simulation with the record parameter set.")
+    filename = output_file(output_dir, prefix, image_format)
+    commands = header(filename, image_format, width, height, title(series))
+    plots = []
+    data = []
+    for name, series_title, style in SERIES:
+        if series.get(name):
+            plots.append("'-' title '%s' with steps ls %i"% (series_title, style))
+            data.extend(inline_data(downsample(series[name], width)))
+    commands.append('plot ' + ', '.join(plots))
+    run_gnuplot(commands + data, filename)
+    return filename
+
+def render_band(results, output_dir='.', image_format='png', width=WIDTH, height=HEIGHT, prefix='ensemble',
+                quantiles=(0.05, 0.5, 0.95)):
+    """Renders the quantile bands of the evolution of the population of many simulations to an image file.
+
+    For every series, the area between the lowest and the highest quantiles is filled
+    and the middle quantile (the median, by default) is drawn as a line.
+
+    Input: a list of results or of names of result files, and the quantiles to plot
+    Output: the name of the rendered image file
+    """
+    results = [load_result(result) if isinstance(result, basestring) else result for result in results]
+    names = [name for name, series_title, style in SERIES if [r for r in results if r['series'].get(name)]]
+    if not names:
+        raise ValueError("the results have no recorded series: run the simulations with the record parameter set.")
+    filename = output_file(output_dir, prefix, image_format)
+    commands = header(filename, image_format, width, height, title(names))
+    commands.append('set style fill transparent solid 0.3 noborder')
+    plots = []
+    data = []
+    for name, series_title, style in SERIES:
+        if name in names:
+            rows = quantile_bands(results, name, quantiles, width)
+            plots.append("'-' using 1:2:%i notitle with filledcurves ls %i"% (len(quantiles) + 1, style))
+            plots.append("'-' using 1:%i title '%s' with lines ls %i"% (len(quantiles) // 2 + 2, series_title, style))
+            data.extend(inline_data(rows) + inline_data(rows))
+    commands.append('plot ' + ', '.join(plots))
+    run_gnuplot(commands + data, filename)
+    return filename
+
+def render_job(job):
+    """Renders a single run, unpacking the arguments; used by the process pool."""
+    result, options = job
+    return render_run(result, **options)
+
+def render_runs(results, processes=None, **options):
+    """Renders many simulations to image files, each one with render_run(), using a pool of processes.
+
+    Input: a list of results or of names of result files, the number of processes
+           (by default, the number of cpus) and the options of render_run()
+    Output: the list of the names of the rendered image files
+    """
+    jobs = [(result, options) for result in results]
+    if processes == 1 or len(jobs) <= 1:
+        return map(render_job, jobs)
+    import multiprocessing
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(render_job, jobs)
+    finally:
+        pool.close()
+        pool.join()
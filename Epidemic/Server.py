@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: iso8859-1 -*-
+
+"""Server module, useful to watch a running epidemic simulation from a browser."""
+
+import BaseHTTPServer
+import SocketServer
+import json
+import sys
+import threading
+import time
+
+import Epidemic
+
+PAGE = """<html>
+  <head>
+    <title>Epidemic simulation</title>
+  </head>
+  <body>
+    <h1>Epidemic simulation</h1>
+    <p>
+      <button onclick="command('pause')">Pause</button>
+      <button onclick="command('resume')">Resume</button>
+      <button onclick="command('stop')">Stop</button>
+    </p>
+    <table>
+      <tr><td>state</td><td id="state"></td></tr>
+      <tr><td>time</td><td id="time"></td></tr>
+      <tr><td>susceptibles</td><td id="susceptibles"></td></tr>
+      <tr><td>infects</td><td id="infects"></td></tr>
+      <tr><td>immunes</td><td id="immunes"></td></tr>
+      <tr><td>deaths for the epidemic</td><td id="deaths"></td></tr>
+      <tr><td>births</td><td id="newborns"></td></tr>
+      <tr><td>deaths for natural reasons</td><td id="natural_deaths"></td></tr>
+      <tr><td>events</td><td id="events"></td></tr>
+    </table>
+    <script>
+      function command(name) {
+        var request = new XMLHttpRequest();
+        request.open('POST', '/' + name);
+        request.send();
+      }
+      var source = new EventSource('/events');
+      source.onmessage = function(event) {
+        var snapshot = JSON.parse(event.data);
+        for (var key in snapshot) {
+          document.getElementById(key).textContent = snapshot[key];
+        }
+        if (snapshot.state == 'finished') {
+          source.close();
+        }
+      };
+    </script>
+  </body>
+</html>
+"""
+
+class ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """An HTTP server handling every request in its own thread."""
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        """Reports the errors, but not the browsers closing the connection."""
+        if not isinstance(sys.exc_info()[1], IOError):
+            BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Handles the requests of the browser: the page, the stream of snapshots and the commands."""
+
+    def do_GET(self):
+        """Sends the page, the current snapshot or the stream of snapshots."""
+        if self.path == '/':
+            self.send_content('text/html', PAGE)
+        elif self.path == '/snapshot':
+            self.send_content('application/json', json.dumps(self.server.epidemic_server.snapshot()))
+        elif self.path == '/events':
+            self.send_events()
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        """Sends a command to the running simulation.
+
+        Commands coming from pages of other origins are refused, so that no other site
+        opened in the browser can pause or stop the simulation.
+        """
+        origin = self.headers.getheader('Origin')
+        port = self.server.epidemic_server.port
+        if origin is not None and origin not in ['http://127.0.0.1:%i'% (port), 'http://localhost:%i'% (port)]:
+            self.send_error(403)
+            return
+        commands = dict(pause=self.server.epidemic_server.pause,
+                        resume=self.server.epidemic_server.resume,
+                        stop=self.server.epidemic_server.stop)
+        command = commands.get(self.path.strip('/'))
+        if command is None:
+            self.send_error(404)
+        else:
+            command()
+            self.send_content('application/json', json.dumps(self.server.epidemic_server.snapshot()))
+
+    def send_content(self, content_type, content):
+        """Sends a whole response with the given content."""
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def send_events(self):
+        """Sends the snapshots as Server-Sent Events, at most one every interval, until the simulation ends.
+
+        Snapshots are coalesced: only the last one is sent, whatever the number of changes in the meantime.
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        sent = None
+        try:
+            while True:
+                snapshot = self.server.epidemic_server.snapshot()
+                if snapshot != sent:
+                    self.wfile.write('data: %s\n\n'% (json.dumps(snapshot)))
+                    self.wfile.flush()
+                    sent = snapshot
+                if snapshot['state'] == 'finished':
+                    break
+                time.sleep(self.server.epidemic_server.interval)
+        except IOError:
+            # the browser closed the connection
+            pass
+
+    def log_message(self, format, *args):
+        """Doesn't log the requests, that are too many with the stream of snapshots."""
+        pass
+
+class Server:
+    """A class for running an epidemic simulation while serving its evolution to browsers on localhost.
+
+    The simulation runs in a background thread and, at every change of the population, only
+    replaces the current snapshot: sending it to the browsers is up to the server threads,
+    so watching the simulation never slows it down.
+    """
+
+    def __init__(self, epidemic_params, port=8000, interval=0.5):
+        """The constructor of the class.
+           Full params' list:
+            - epidemic_params: the parameters of the epidemic, as for the Epidemic class
+            - port: port of the server, listening on localhost
+            - interval: minimum time in seconds between two snapshots sent to a browser
+        """
+        self.epidemic_params = epidemic_params
+        self.port = port
+        self.interval = interval
+        self.state = 'running'
+        self.counters = (0, epidemic_params.get('nr_individuals') - epidemic_params.get('initial_infects') - epidemic_params.get('initial_immunes', 0),
+                         epidemic_params.get('initial_infects'), epidemic_params.get('initial_immunes', 0), 0, 0, 0, 0)
+        self.running = threading.Event()
+        self.running.set()
+        # commands come from concurrent server threads: the changes of state are done under this lock
+        self.lock = threading.Lock()
+
+    def snapshot(self):
+        """Returns the last state of the population."""
+        sim_time, susceptibles, infects, immunes, deaths, newborns, natural_deaths, events = self.counters
+        return dict(state=self.state, time=sim_time, susceptibles=susceptibles, infects=infects, immunes=immunes,
+                    deaths=deaths, newborns=newborns, natural_deaths=natural_deaths, events=events)
+
+    def observe(self, epidemic):
+        """Replaces the snapshot after a change of the population and applies the commands.
+
+        Used as the stop condition of the simulation: it returns true if the simulation has to be stopped,
+        and waits while the simulation is paused.
+        """
+        self.counters = (epidemic.statistics.end_time, epidemic.total_susceptibles, epidemic.total_infects,
+                         epidemic.total_immunes, epidemic.total_deaths, epidemic.total_newborns,
+                         epidemic.total_natural_deaths, epidemic.statistics.nr_events)
+        self.running.wait()
+        if self.state == 'stopped':
+            return True
+        user_stop_condition = self.epidemic_params.get('stop_condition')
+        return user_stop_condition is not None and user_stop_condition(epidemic)
+
+    def change_state(self, states, new_state, running):
+        """Changes the state of the simulation, if it's one of the given ones, and lets it run or not.
+
+        The check and the change are done under the lock, so that concurrent commands cannot interleave.
+        """
+        self.lock.acquire()
+        try:
+            if self.state in states:
+                self.state = new_state
+                if running:
+                    self.running.set()
+                else:
+                    self.running.clear()
+        finally:
+            self.lock.release()
+
+    def pause(self):
+        """Pauses the simulation at the next change of the population."""
+        self.change_state(['running'], 'paused', running=False)
+
+    def resume(self):
+        """Resumes the paused simulation."""
+        self.change_state(['paused'], 'running', running=True)
+
+    def stop(self):
+        """Stops the simulation at the next change of the population."""
+        self.change_state(['running', 'paused'], 'stopped', running=True)
+
+    def simulate(self):
+        """Runs the simulation; it's the body of the background thread."""
+        params = dict(self.epidemic_params)
+        params.update(stop_condition=self.observe, progress=False, plot=False)
+        try:
+            Epidemic.Epidemic(params)
+        finally:
+            self.change_state(['running', 'paused', 'stopped'], 'finished', running=True)
+
+    def serve(self):
+        """Starts the simulation and serves it on localhost until interrupted."""
+        httpd = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        httpd.epidemic_server = self
+        simulation = threading.Thread(target=self.simulate)
+        simulation.daemon = True
+        simulation.start()
+        print "Serving the simulation on http://127.0.0.1:%i/ (press Ctrl-C to quit)"% (self.port)
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        httpd.server_close()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: iso8859-1 -*-
+
+"""Splitting module, useful to estimate the probability of rare events of an epidemic."""
+
+from __future__ import division
+
+import random
+
+import Epidemic
+
+class Splitting:
+    """A class for estimating the probability of rare epidemic events with multilevel splitting.
+
+    The rare event is the crossing of the last of the given prevalence levels (infects over
+    living individuals) before the end of the simulation: with increasing levels it's a large
+    outbreak, with decreasing levels (ending with 0) it's an early fade-out of the epidemic.
+    Every time a simulation crosses an intermediate level, its state is saved and the next
+    stage starts new simulations from the saved states, so that the rare event is reached
+    as a sequence of likely ones (fixed effort splitting).
+
+    Since individuals are indistinguishable and every event but the natural death happens
+    after an exponentially distributed time, the state of a simulation is fully described by
+    the number of susceptibles, infects and immunes and by the current time: a clone restarts
+    from these counters, drawing again the pending events of the individuals, with its own seed.
+    The natural death is drawn at the start of every life cycle of an individual, so the
+    individuals of a clone, already in the middle of their cycle, skip that draw (see the
+    "restart" parameter of the Epidemic class).
+    """
+
+    def __init__(self, epidemic_params, levels, trials=100, replications=10, seed=None):
+        """The constructor of the class.
+           Full params' list:
+            - epidemic_params: the parameters of the epidemic, as for the Epidemic class
+            - levels: the prevalence levels to cross, from the nearest to the rare one
+            - trials: number of simulations started at every level
+            - replications: number of independent estimates, used to compute the variance
+            - seed: seed of the random number generator, for reproducible estimates
+        """
+        self.epidemic_params = epidemic_params
+        self.levels = levels
+        self.trials = trials
+        self.replications = replications
+        self.rng = random.Random(seed)
+        self.run_time = epidemic_params.get('run_time')
+        self.initial_state = dict(
+            time = 0,
+            susceptibles = epidemic_params.get('nr_individuals') - epidemic_params.get('initial_infects') - epidemic_params.get('initial_immunes', 0),
+            infects = epidemic_params.get('initial_infects'),
+            immunes = epidemic_params.get('initial_immunes', 0))
+        self.increasing = levels[-1] > self.prevalence(self.initial_state)
+        self.estimates = []
+        self.level_probabilities = []
+        self.probability = None
+        self.variance = None
+
+    def prevalence(self, state):
+        """Returns the fraction of infects over the living individuals of the given state."""
+        living = state['susceptibles'] + state['infects'] + state['immunes']
+        if living == 0:
+            return 0
+        return state['infects'] / living
+
+    def level_crossed(self, state, level):
+        """Checks if the given state has crossed the given prevalence level."""
+        if self.increasing:
+            return self.prevalence(state) >= level
+        else:
+            return self.prevalence(state) <= level
+
+    def run_trial(self, state, level):
+        """Runs a simulation from the given state until it crosses the given level.
+
+        Input: the state from which the simulation starts and the level to cross
+        Output: the state at the crossing of the level, or None if the level is not crossed
+        """
+        if self.level_crossed(state, level):
+            return state
+        remaining_time = self.run_time - state['time']
+        if remaining_time <= 0:
+            return None
+        crossing = {}
+        def stop_condition(epidemic):
+            current = dict(
+                susceptibles = epidemic.total_susceptibles,
+                infects = epidemic.total_infects,
+                immunes = epidemic.total_immunes)
+            if not crossing and self.level_crossed(current, level):
+                crossing.update(current, time=state['time'] + epidemic.statistics.end_time)
+                return True
+            return False
+        params = dict(self.epidemic_params)
+        params.update(
+            nr_individuals = state['susceptibles'] + state['infects'] + state['immunes'],
+            initial_infects = state['infects'],
+            initial_immunes = state['immunes'],
+            run_time = remaining_time,
+            seed = self.rng.getrandbits(32),
+            stop_condition = stop_condition,
+            debug = False,
+            process_debug = False,
+            progress = False,
+            stats = False,
+            plot = False,
+            record = False,
+            quiet = True,
+            restart = True)
+        Epidemic.Epidemic(params)
+        return crossing or None
+
+    def run_replication(self):
+        """Returns one estimate of the probability of crossing all the levels.
+
+        The estimate is the product of the fractions of the trials crossing every level,
+        each trial starting from a state chosen at random among those crossing the previous one.
+        """
+        states = [self.initial_state]
+        probability = 1
+        level_probabilities = []
+        for level in self.levels:
+            crossings = []
+            for i in range(self.trials):
+                crossing = self.run_trial(self.rng.choice(states), level)
+                if crossing is not None:
+                    crossings.append(crossing)
+            level_probabilities.append(len(crossings) / self.trials)
+            probability *= level_probabilities[-1]
+            if not crossings:
+                break
+            states = crossings
+        self.level_probabilities.append(level_probabilities)
+        return probability
+
+    def estimate(self):
+        """Estimates the probability of crossing all the levels and the variance of the estimate.
+
+        Output: the estimated probability and its variance (None with a single replication)
+        """
+        self.estimates = []
+        self.level_probabilities = []
+        for i in range(self.replications):
+            self.estimates.append(self.run_replication())
+        self.probability = sum(self.estimates) / self.replications
+        if self.replications > 1:
+            self.variance = sum([(p - self.probability) ** 2 for p in self.estimates]) / \
+                            (self.replications - 1) / self.replications
+        else:
+            self.variance = None
+        return self.probability, self.variance
+
+    def show_stats(self):
+        """Prints some data about the estimate."""
+        if self.probability is None:
+            print "\nNo estimate yet: call estimate() first."
+            return
+        print "\nEstimated probability: %g"% (self.probability)
+        if self.variance is not None:
+            print "- variance: %g"% (self.variance)
+            if self.probability:
+                print "- relative error: %g"% (self.variance ** 0.5 / self.probability)
+        print "- replications: %i, trials per level: %i"% (self.replications, self.trials)
+        for i, level in enumerate(self.levels):
+            probabilities = [p[i] for p in self.level_probabilities if len(p) > i]
+            print "- level %g: mean crossing probability %g"% (level, sum(probabilities) / self.replications)
@@ -2,6 +2,10 @@
 
 """Epidemic package.
 
-Contains the following module:
+Contains the following modules:
 Epidemic - a module implementing an epidemics' simulation.
+Splitting - a module estimating the probability of rare epidemic events with multilevel splitting.
+Plot - a module rendering the results of many simulations to image files.
+Server - a module serving a running simulation to browsers on localhost.
+Batch - a module running many simulations described by scenario files.
 """
\ No newline at end of file
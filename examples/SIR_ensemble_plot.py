@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+
+"""Many runs of a simple epidemiological model, SIR, with:
+    - recover
+    - permanent immunization
+but
+    - no death
+    - no vital dynamics
+
+The results of the runs are saved to files, then rendered without any display:
+every run to its own image and all the runs together as quantile bands.
+"""
+
+from Epidemic import Epidemic, Plot
+
+epidemic_params = dict(
+    nr_individuals = 100,
+    initial_infects = 10,
+    infect_prob = 0.003,
+    contact_rate = 1,
+    recover_rate = 0.003,
+    immune_after_recovery = True,
+    run_time = 5000,
+    progress = False,
+    stats = False,
+    plot = False
+)
+
+result_files = []
+for i in range(10):
+    run = Epidemic.Epidemic(epidemic_params)
+    result_files.append('SIR_run_%i.json' % i)
+    run.save_result(result_files[-1])
+
+print "Runs rendered to %s" % ', '.join(Plot.render_runs(result_files))
+print "Ensemble rendered to %s" % Plot.render_band(result_files, image_format='svg')
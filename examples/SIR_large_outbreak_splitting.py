@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+
+"""Estimate of the probability of a rare event, a large outbreak, in a SIR model with:
+    - recover
+    - permanent immunization
+but
+    - no death
+    - no vital dynamics
+
+The rare event is the prevalence of the infection reaching 80% of the population
+before the end of the simulation, while most outbreaks peak between 40% and 60%:
+its probability, in the order of 1e-4, is estimated with multilevel splitting,
+crossing the intermediate prevalence levels 50%, 60%, 65%, 70% and 75%.
+It takes a few minutes.
+"""
+
+from Epidemic import Splitting
+
+epidemic_params = dict(
+    nr_individuals = 50,
+    initial_infects = 2,
+    infect_prob = 0.006,
+    contact_rate = 1,
+    recover_rate = 0.003,
+    immune_after_recovery = True,
+    run_time = 5000
+)
+
+splitting = Splitting.Splitting(epidemic_params, levels=[0.5, 0.6, 0.65, 0.7, 0.75, 0.8],
+                                trials=40, replications=8)
+splitting.estimate()
+splitting.show_stats()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+
+"""The SIR model with temporary immunization and vital dynamics, watched live from a browser.
+
+Open http://127.0.0.1:8000/ while the simulation runs to see the population change,
+and to pause, resume or stop the simulation.
+"""
+
+from Epidemic import Server
+
+epidemic_params = dict(
+    nr_individuals = 100,
+    initial_infects = 10,
+    initial_immunes = 0,
+    infect_prob = 0.003,
+    contact_rate = 1,
+    recover_rate = 0.003,
+    immune_after_recovery = True,
+    immunization_vanish_rate = 0.001,
+    death_rate = 0.0001,
+    newborn_prob = 0.0001,
+    natural_death_prob = 0.01,
+    run_time = 50000
+)
+
+Server.Server(epidemic_params, port=8000).serve()
@@ -1,4 +1,7 @@
-from distutils.core import setup
+try:
+    from setuptools import setup
+except ImportError:
+    from distutils.core import setup
 
 setup(
     version="0.1",
@@ -24,5 +27,6 @@ At the end, it's possible to print some statistics about the simulation and the
     name="Epidemic",
     keywords=["simulation","epidemic"],
     packages=["Epidemic"],
-    requires=["SimPy"]
+    requires=["SimPy"],
+    entry_points={"console_scripts": ["epidemic = Epidemic.Batch:main"]}
 )
\ No newline at end of file